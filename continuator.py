@@ -21,6 +21,12 @@ import mido
 from mido import MidiTrack, Message, open_input, open_output, get_input_names, get_output_names
 import os
 import pickle
+import gc
+import threading
+import sys
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
 
 # constants
 _min_midi_pitch = 0
@@ -33,6 +39,11 @@ _continuator_stop_player_stop_threshold = 15.0  # Silence duration after which C
 _max_continuation_length = 100			    # Maximum number of events (= double number of notes) of a continuation
 _max_played_notes_considered = 30		    # Maximum last number of played notes considered for training
 _max_order = 20                             # Maximum Markov oder (and thus generation length) for each generation of continuation note
+_adaptive_tuning_mode = False               # If True, the maximum order, continuation length and number of played notes considered
+                                            # are adjusted at run time (below the above maximum values) to meet the target response latency
+_target_response_latency = 0.05             # Target duration (in seconds) of the generation of a continuation, for the adaptive tuning mode
+_min_adaptive_order = 2                     # Minimum values for the adaptive tuning mode
+_min_adaptive_continuation_length = 10
 _default_generated_note_duration = 0.5	    # Default duration for generated notes (for batch test)
 _default_generated_note_velocity = _max_midi_velocity   # Default velocity for generated notes (for batch test)
 _key_transposition_semi_tones = 6			# Transposition into N semitones above and N-1 below. If N = 6, this corresponds to a full transposition into the other 11 keys.
@@ -46,6 +57,16 @@ _generation_duration_mode = 'Learnt'        # 3 possible modes for the durations
                                             # Played: duration of the notes played
                                             # Fixed: fixed (_default_fixed_duration) duration
 _default_fixed_duration = 0.1               # int in case of 'File' (Midi export) mode
+_corpus_midi_file_name_list = ['PrePlayed.mid']  # MIDI files of the corpus from which the memory is (re)built in 'Build' mode
+_initial_memory_name = 'Default'            # Name of the memory read from PreMemory.pickle (and initially used)
+_program_change_memory_name_dictionary = {} # Memory switched to on a MIDI program change, key : program number, value : memory name, e.g., {0: 'Default', 1: 'Bach', 2: 'Jazz'}
+_shared_memory_publication_mode = False     # If True, a frozen (read-only) version of the memory is published in shared memory after each training,
+                                            # for generation workers (processes) to attach to it without copying it
+_shared_memory_name = 'Continuator'         # Name of the shared memory (control) block, in which the current version number is published
+_generation_worker_number = 4               # Number of generation worker processes in 'Workers' mode
+_generation_constraint = None               # Optional constraint (a NoteConstraint, defined below) enforced on the continuation,
+                                            # e.g., NoteConstraint(length=8, end_pitch_list=[60], forbidden_pitch_list=[61, 63], min_pitch=48, max_pitch=72)
+                                            # If None, the continuation is generated without constraint
 
 class Note:                                 # Structure of a note
     def __init__(self, pitch, duration, velocity, start_time, delta):
@@ -83,21 +104,217 @@ def pitch_sequence_to_note_sequence(pitch_sequence):    # For Batch test
         note_sequence.append(note)
     return note_sequence
 
+def set_generated_note_duration(note, note_sequence, i):    # Set the duration of the ith generated note, depending on the generation duration mode
+    match _generation_duration_mode:
+        # case 'Learnt':                    If Learnt duration, do nothing specific
+        case 'Played':
+            ii = i
+            if ii > len(note_sequence):
+                ii = i - len(note_sequence)
+            note.duration = note_sequence[ii - 1].duration
+        case 'Fixed':
+            note.duration = _default_fixed_duration
+
+# The generation algorithms below traverse a memory through a small accessor interface: root(pitch), children(node), node_pitch(node),
+# continuations(node), note(continuation_index) and continuation_number(), implemented on the prefix trees (PrefixTreeContinuator)
+# and on the flat arrays published in shared memory (SharedMemoryContinuator)
+
+def matching_node_list(memory, note_sequence, length_note_sequence, max_order):
+                                                                    # Nodes matching the end of the input sequence, from the root (order 1) down to the longest match
+                                                                    # (empty list if there is no matching tree root)
+    current_node = memory.root(note_sequence[-1].pitch)             # We start with the last note of the reverse sequence: Note_N
+    if current_node is None:
+        return []
+    node_list = [current_node]
+    j = 2                                                           # Set up j index for a loop for traversing the tree
+                                                                    # j is the index of the jth last note of the input sequence
+                                                                    # and also the level within the tree
+                                                                    # Thus initially, j = 2 : starting with children from the root node to match penultimate note
+    while j < length_note_sequence and (max_order is None or j <= max_order):
+                                                                    # Iteration to traverse the tree, with at each level (j),
+                                                                    # looking for a node matching corresponding note (last jth) of the input sequence
+                                                                    # The stop condition is:
+                                                                    # a) current node is a leaf (with no children)
+                                                                    # or b) j >= length of sequence of notes (i.e. we already parsed all notes of the input sequence)
+                                                                    # or c) j > maximum order (if any)
+                                                                    # or d) none of the children matches
+        matching_child = None                                       # Assign a flag to know if we have found a matching node within children
+        for child in memory.children(current_node):                 # Iterate over children nodes to look for a node matching jth last note from input sequence
+            if memory.node_pitch(child) == note_sequence[-j].pitch: # If one matches it (only pitch)
+                matching_child = child                              # then, remember which it is
+                break                                               # and exit from this children iteration loop
+        if matching_child is None:                                  # If none of the children matches it (or current node is a leaf),
+            break                                                   # then, exit from the traversal to stop the search
+        current_node = matching_child                               # otherwise, we continue traversing the tree from current child node
+        node_list.append(current_node)
+        j += 1                                                      # and down one more level (and previous element of the input sequence)
+    return node_list
+
+def generate_continuation_note_sequence(memory, note_sequence, max_order, max_continuation_length, matched_order_list=None):
+                                                                    # Generation of a continuation from a memory, max_order is None if unbounded
+    length_note_sequence = len(note_sequence)                       # Remember length of the played input sequence of notes, because note_sequence will be expanded (append)
+    continuation_sequence = []                                      # Initialization: Assign continuation list to empty list
+    for i in range(1, max_continuation_length):
+        node_list = matching_node_list(memory, note_sequence, length_note_sequence, max_order)
+        if not node_list:                                           # If there is no matching tree root thus we cannot generate a continuation
+            if _general_default_random_generation_mode and memory.continuation_number() > 0:     # If default random generation mode
+                next_note = memory.note(random.randint(1, memory.continuation_number()))
+            elif i == 1 and _first_continuation_default_random_generation_mode and memory.continuation_number() > 0:
+                next_note = memory.note(random.randint(1, memory.continuation_number()))
+                set_generated_note_duration(next_note, note_sequence, i)
+            else:                                                   # Otherwise, no continuation possible,
+                break                                               # and we exit from loop
+        else:                                                       # Otherwise, we create a new continuation note
+            if matched_order_list is not None:
+                matched_order_list.append(len(node_list))           # Remember the order of the matching (for the adaptive tuning mode)
+            continuation_index_list = memory.continuations(node_list[-1])
+            next_note = memory.note(continuation_index_list[random.randint(0, len(continuation_index_list) - 1)])
+                                                                    # by sorting within the longest matching node list of continuations
+                                                                    # as there may have several occurrences of the same note,
+                                                                    # this implements the probabilities of a Markov model
+            set_generated_note_duration(next_note, note_sequence, i)
+        note_sequence.append(next_note)                             # Add this continuation note to the list of input notes
+        continuation_sequence.append(next_note)                     # Add this continuation note to the list of continuations
+                                                                    # And continue the generation from this (new) last note
+    return continuation_sequence
+
+def shared_memory_array_dictionary(buffer):    # Views (without copy) on the flat arrays of a frozen memory within a shared memory buffer
+                                                # The buffer starts with a header: number of nodes, of continuations (in node lists) and of notes
+    header = np.ndarray((3,), dtype=np.int64, buffer=buffer)
+    node_number, continuation_number, note_number = header.tolist()
+    array_dictionary = {}
+    offset = header.nbytes
+    for array_name, array_length, array_type in [('root_node', _max_midi_pitch + 1, np.int64),    # Index of the root node of each pitch (-1 if none)
+                                                 ('node_pitch', node_number, np.int64),
+                                                 ('node_first_child', node_number, np.int64),     # Children of a node are contiguous
+                                                 ('node_child_number', node_number, np.int64),
+                                                 ('node_continuation_start', node_number, np.int64),  # Continuations of a node are contiguous
+                                                 ('node_continuation_number', node_number, np.int64),
+                                                 ('continuation_index', continuation_number, np.int64),
+                                                 ('note_pitch', note_number, np.int64),           # Notes, indexed by continuation index
+                                                 ('note_velocity', note_number, np.int64),
+                                                 ('note_duration', note_number, np.float64),      # NaN if None
+                                                 ('note_delta', note_number, np.float64)]:
+        array_dictionary[array_name] = np.ndarray((array_length,), dtype=array_type, buffer=buffer, offset=offset)
+        offset += array_length * 8
+    return array_dictionary
+
+def shared_memory_size(node_number, continuation_number, note_number):
+    return 8 * (3 + _max_midi_pitch + 1 + 5 * node_number + continuation_number + 4 * note_number)
+
+def attach_shared_memory(name):             # Attach to an existing shared memory block, which remains owned (and unlinked) by its publisher
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register    # Before Python 3.13, attaching registers the block to be unlinked when this process ends,
+    resource_tracker.register = lambda name, rtype: None    # thus registration is disabled while attaching
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
 class PrefixTreeNode:                       # Structure of a tree node to memorize and index learnt sequences
     def __init__(self):
         self.note = None
         self.children_list = None
         self.continuation_index_list = None
 
+class Memory:                               # Structure of a resident (named) memory, not currently used
+    def __init__(self, root_dictionary, continuation_dictionary, continuation_dictionary_current_index):
+        self.root_dictionary = root_dictionary
+        self.continuation_dictionary = continuation_dictionary
+        self.continuation_dictionary_current_index = continuation_dictionary_current_index
+        self.reachability_index = None
+
+class NoteConstraint:                       # Structure of a constraint on the notes of a continuation
+    def __init__(self, length, end_pitch_list=None, forbidden_pitch_list=None, min_pitch=_min_midi_pitch, max_pitch=_max_midi_pitch):
+        self.length = length                # Exact number of notes of the continuation
+        self.end_pitch_list = end_pitch_list    # Possible pitches of the last note of the continuation (None: any pitch)
+        self.forbidden_pitch_list = forbidden_pitch_list    # Pitches which must not appear in the continuation (None: none)
+        self.min_pitch = min_pitch          # Pitch range (register) of the notes of the continuation
+        self.max_pitch = max_pitch
+
+    def allows(self, pitch):                # Check if a pitch may appear in the continuation
+        if pitch < self.min_pitch or pitch > self.max_pitch:
+            return False
+        return self.forbidden_pitch_list is None or pitch not in self.forbidden_pitch_list
+
+    def allows_end(self, pitch):            # Check if a pitch may be the last note of the continuation
+        return self.allows(pitch) and (self.end_pitch_list is None or pitch in self.end_pitch_list)
+
+    def key(self):                          # Identification of the constraint, for caching its reachable pitch sets
+        end_pitch_key = None if self.end_pitch_list is None else tuple(sorted(self.end_pitch_list))
+        forbidden_pitch_key = None if self.forbidden_pitch_list is None else tuple(sorted(self.forbidden_pitch_list))
+        return self.length, end_pitch_key, forbidden_pitch_key, self.min_pitch, self.max_pitch
+
+class ReachabilityIndex:                    # Index, built once from the memory, of which pitches can follow which pitch
+                                            # and thus of which continuations can still reach a valid end of a constrained continuation
+    def __init__(self, root_dictionary, continuation_dictionary):
+        self.successor_dictionary = {}      # key : pitch, value : set of pitches of the continuations of the corresponding tree root
+        for pitch, root in root_dictionary.items():
+            successor_pitch_set = set()
+            for continuation_index in root.continuation_index_list:
+                successor_pitch_set.add(continuation_dictionary[continuation_index].pitch)
+            self.successor_dictionary[pitch] = successor_pitch_set
+        self.pitch_set = set()              # All pitches of the memory
+        for note in continuation_dictionary.values():
+            self.pitch_set.add(note.pitch)
+        self.reachable_pitch_set_list_dictionary = {}   # Cache, key : constraint key, value : list of reachable pitch sets
+
+    def add(self, pitch, successor_pitch):  # Incremental update of the index, when a continuation is learnt (see internal_train_without_key_transpose)
+        if pitch in self.successor_dictionary:
+            self.successor_dictionary[pitch].add(successor_pitch)
+        else:
+            self.successor_dictionary[pitch] = {successor_pitch}
+        self.pitch_set.add(successor_pitch)
+
+    def clear(self):                        # The reachable pitch sets are to be computed again after training
+        self.reachable_pitch_set_list_dictionary = {}
+
+    def reachable_pitch_set_list(self, constraint):     # List of sets of pitches, such that the kth set contains the pitches
+                                                        # from which a valid end can be reached with k more notes
+        constraint_key = constraint.key()
+        if constraint_key not in self.reachable_pitch_set_list_dictionary:
+            reachable_pitch_set = set()
+            for pitch in self.pitch_set:    # 0 more notes: the pitch must be a valid end
+                if constraint.allows_end(pitch):
+                    reachable_pitch_set.add(pitch)
+            reachable_pitch_set_list = [reachable_pitch_set]
+            for k in range(1, constraint.length):   # k more notes: some successor of the pitch must be reachable with k - 1 more notes
+                previous_reachable_pitch_set = reachable_pitch_set
+                reachable_pitch_set = set()
+                for pitch, successor_pitch_set in self.successor_dictionary.items():
+                    if constraint.allows(pitch) and not successor_pitch_set.isdisjoint(previous_reachable_pitch_set):
+                        reachable_pitch_set.add(pitch)
+                reachable_pitch_set_list.append(reachable_pitch_set)
+            self.reachable_pitch_set_list_dictionary[constraint_key] = reachable_pitch_set_list
+        return self.reachable_pitch_set_list_dictionary[constraint_key]
+
 class PrefixTreeContinuator:                # The main class and corresponding algorithms
     def __init__(self):
         self.root_dictionary = {}
         self.continuation_dictionary = {}
         self.continuation_dictionary_current_index = 1
         self.continuation_sequence = []
+        self.reachability_index = None      # Built from the memory when first needed by a constrained generation
+        self.memory_dictionary = {}         # Resident memories, other than the current one, key : memory name, value : Memory
+        self.current_memory_name = _initial_memory_name
+        self.max_order = _max_order                                         # Current values, adjusted in adaptive tuning mode
+        self.max_continuation_length = _max_continuation_length
+        self.max_played_notes_considered = _max_played_notes_considered
+        self.matched_order_list = []        # Order of the matching (depth within the tree) for each note of the last continuation generated
+        self.shared_memory_control = None   # Shared memory block in which the current version number is published
+        self.shared_memory_version = 0
+        self.shared_memory_list = []        # Shared memory blocks of the current and previous published versions
+        self.memory_lock = threading.Lock() # Held while the current memory (its references) is replaced, for a publication to capture a consistent one
+        self.shared_memory_lock = threading.Lock()  # Publications (versions) are serialized
+        self.publication_request = threading.Event()    # Set for a publication to be done by the publication thread
+        self.publication_thread = None      # Started when a first publication is requested
+        self.publication_stop = False
 
     def train(self, note_sequence):         # Main entry function lo train the Continuator with a sequence of notes
                                             # note_sequence = [(<pitch_1>, <duration_1>, <velocity_#), ... , (<pitch_N>, <duration_N>, <velocity_N>)]
+        if self.reachability_index is not None: # Memory is changing, thus the reachable pitch sets will have to be computed again
+            self.reachability_index.clear()     # (the index itself is updated for each continuation learnt)
         self.compute_delta(note_sequence)
         self.internal_train_without_key_transpose(note_sequence)    # Train with input sequence
         if _key_transposition_semi_tones > 0:
@@ -136,6 +353,8 @@ class PrefixTreeContinuator:                # The main class and corresponding a
             continuation_note = sub_reversed_note_sequence[0]       # Continuation_note = note_i
             self.continuation_dictionary[self.continuation_dictionary_current_index] = continuation_note    # Add it to the continuation dictionary
             root_note = sub_reversed_note_sequence[1]               # Second note of the sub sequence is the note to be searched/matched as a root of a tree
+            if self.reachability_index is not None:                 # Update the reachability index (if already built)
+                self.reachability_index.add(root_note.pitch, continuation_note.pitch)
             if root_note.pitch not in self.root_dictionary:         # If the note has not yet some corresponding prefix tree root,
                 current_node = PrefixTreeNode()                     # then, creation of the corresponding new tree (root)
                 self.root_dictionary[root_note.pitch] = current_node
@@ -172,6 +391,98 @@ class PrefixTreeContinuator:                # The main class and corresponding a
             self.continuation_dictionary_current_index += 1
             i += 1                                                 # Continue the matching search iteration one level down
 
+    def build_memory(self, note_sequence_list):     # Bulk construction of the memory from a corpus (list of sequences of notes)
+                                                    # The memory built is equal to the one built by successive train calls (on an initially empty memory),
+                                                    # but all contexts of a given order (depth in the trees) are computed at once with NumPy,
+                                                    # by sorting and grouping, thus without a tree traversal for each position and depth
+        if not note_sequence_list or len(note_sequence_list[0]) <= 1:
+            raise RuntimeError('Only one note initially played, thus none continuation can be learnt and therefore generated')
+        training_sequence_list = []                 # Sequences in the same order as train would learn them, transpositions included
+        for note_sequence in note_sequence_list:
+            self.compute_delta(note_sequence)
+            training_sequence_list.append(note_sequence)
+            if _key_transposition_semi_tones > 0 and note_sequence:
+                note_pitch_sequence = note_sequence_to_pitch_sequence(note_sequence)
+                down_iterations_number = min(min(note_pitch_sequence) - _min_midi_pitch, _key_transposition_semi_tones - 1)
+                up_iterations_number = min(_max_midi_pitch - max(note_pitch_sequence), _key_transposition_semi_tones)
+                for i in range(1, down_iterations_number + 1):
+                    training_sequence_list.append(self.transpose(note_sequence, -i))
+                for i in range(1, up_iterations_number + 1):
+                    training_sequence_list.append(self.transpose(note_sequence, i))
+        note_list = []                              # All notes, concatenated
+        position_list = []                          # Position of each note within its sequence
+        continuation_index_list = []                # Continuation index of each note (0 for the first note of a sequence)
+        continuation_dictionary_current_index = 1
+        for note_sequence in training_sequence_list:
+            length = len(note_sequence)
+            if length == 0:
+                continue
+            note_list.extend(note_sequence)
+            position_list.extend(range(length))
+            continuation_index_list.append(0)       # As train, the last note of a sequence is the first continuation learnt
+            continuation_index_list.extend(range(continuation_dictionary_current_index + length - 2, continuation_dictionary_current_index - 1, -1))
+            continuation_dictionary_current_index += length - 1
+        pitch_array = np.array([note.pitch for note in note_list], dtype=np.int64)
+        position_array = np.array(position_list, dtype=np.int64)
+        continuation_index_array = np.array(continuation_index_list, dtype=np.int64)
+        continuation_dictionary = {}
+        for g in np.flatnonzero(position_array >= 1).tolist():
+            continuation_dictionary[continuation_index_list[g]] = note_list[g]
+        root_dictionary = {}
+        g_array = np.flatnonzero(position_array >= 1)   # Positions (in the concatenation) of all continuations
+        parent_id_array = np.zeros(len(g_array), dtype=np.int64)    # Node (at the previous depth) matched by each continuation
+        parent_node_list = None
+        gc_enabled = gc.isenabled()                 # Garbage collection is suspended while creating the (possibly millions of) nodes,
+        gc.disable()                                # as they are all kept, collection passes would only slow down the construction
+        try:
+            k = 1                                   # Depth in the trees, i.e., order of the context: notes g-1, ..., g-k
+            while len(g_array) > 0:
+                key_array = parent_id_array * (_max_midi_pitch + 1) + pitch_array[g_array - k]  # A node is identified by its parent and its note pitch
+                node_key_array, node_id_array = np.unique(key_array, return_inverse=True)
+                node_id_array = node_id_array.reshape(-1)
+                g_continuation_index_array = continuation_index_array[g_array]
+                order = np.lexsort((g_continuation_index_array, node_id_array))  # Grouping by node, continuations in increasing order (as train appends them)
+                sorted_node_id_array = node_id_array[order]
+                start_array = np.flatnonzero(np.r_[True, sorted_node_id_array[1:] != sorted_node_id_array[:-1]])
+                end_array = np.r_[start_array[1:], len(order)]
+                creation_order = np.argsort(g_continuation_index_array[order][start_array], kind='stable')
+                                                    # Nodes are created in the same order as train (by their first continuation learnt),
+                                                    # thus children lists are in the same order
+                creation_rank_array = np.empty(len(creation_order), dtype=np.int64)
+                creation_rank_array[creation_order] = np.arange(len(creation_order))
+                sorted_continuation_index_list = g_continuation_index_array[order].tolist()
+                note_index_list = (g_array[order][start_array][creation_order] - k).tolist()   # Note of the first continuation learnt, which created the node
+                parent_id_list = (node_key_array[creation_order] // (_max_midi_pitch + 1)).tolist()
+                node_list = []
+                for note_index, parent_id, start, end in zip(note_index_list, parent_id_list, start_array[creation_order].tolist(), end_array[creation_order].tolist()):
+                    node = PrefixTreeNode()
+                    node.note = note_list[note_index]
+                    node.continuation_index_list = sorted_continuation_index_list[start:end]
+                    node_list.append(node)
+                    if k == 1:
+                        root_dictionary[node.note.pitch] = node
+                    else:
+                        parent_node = parent_node_list[parent_id]
+                        if parent_node.children_list is None:
+                            parent_node.children_list = [node]
+                        else:
+                            parent_node.children_list.append(node)
+                deeper = position_array[g_array] > k    # Continuations with a context of order k + 1
+                g_array = g_array[deeper]
+                parent_id_array = creation_rank_array[node_id_array[deeper]]
+                parent_node_list = node_list
+                k += 1
+        finally:
+            if gc_enabled:
+                gc.enable()
+        with self.memory_lock:
+            self.root_dictionary = root_dictionary
+            self.continuation_dictionary = continuation_dictionary
+            self.continuation_dictionary_current_index = continuation_dictionary_current_index
+            self.reachability_index = None
+        if _shared_memory_publication_mode:
+            self.publish_shared_memory()
+
     def display_memory(self):
          print('Memory:')
          for dummy, root in self.root_dictionary.items():
@@ -189,18 +500,179 @@ class PrefixTreeContinuator:                # The main class and corresponding a
                 self.display_tree(child, level + 1)
 
     def save_memory(self):
-        print('Save memory in file PostMemory.pickle')
-        with open('PostMemory.pickle', 'wb') as post_memory_file:
-            pickle.dump([self.root_dictionary, self.continuation_dictionary], post_memory_file)
+        memory_file_dictionary = {self.current_memory_name: [self.root_dictionary, self.continuation_dictionary]}  # All resident memories
+        for memory_name, memory in self.memory_dictionary.items():
+            memory_file_dictionary[memory_name] = [memory.root_dictionary, memory.continuation_dictionary]
+        print('Save memory ' + _initial_memory_name + ' in file PostMemory.pickle')
+        with open('PostMemory.pickle', 'wb') as post_memory_file:  # The initial memory, whichever memory is currently used
+            pickle.dump(memory_file_dictionary.pop(_initial_memory_name), post_memory_file)
+        if memory_file_dictionary:          # If there are other resident memories, save them together in a single file
+            print('Save memories ' + str(list(memory_file_dictionary)) + ' in file PostMemories.pickle')
+            with open('PostMemories.pickle', 'wb') as post_memories_file:
+                pickle.dump(memory_file_dictionary, post_memories_file)
 
     def read_memory(self):
-        if os.path.isfile('PreMemory.pickle'):
+        pre_memory_read = os.path.isfile('PreMemory.pickle')
+        if pre_memory_read:
             print('Read memory from PreMemory.pickle')
             with open('PreMemory.pickle', 'rb') as pre_memory_file:
                 [self.root_dictionary, self.continuation_dictionary] = pickle.load(pre_memory_file)
-
-    def generate(self, input_note_sequence):                              # Generation of a continuation sequence of MIDI messages from an input (played) sequence
-        note_sequence = self.generate_note_sequence(input_note_sequence)
+            self.continuation_dictionary_current_index = max(self.continuation_dictionary, default=0) + 1
+            self.reachability_index = None
+        if os.path.isfile('PreMemories.pickle'):    # Other named memories, made resident at once, in order to switch between them without reading them again
+            with open('PreMemories.pickle', 'rb') as pre_memories_file:
+                memory_file_dictionary = pickle.load(pre_memories_file)
+            print('Read memories ' + str(list(memory_file_dictionary)) + ' from PreMemories.pickle')
+            for memory_name, [root_dictionary, continuation_dictionary] in memory_file_dictionary.items():
+                memory = Memory(root_dictionary, continuation_dictionary, max(continuation_dictionary, default=0) + 1)
+                if memory_name == self.current_memory_name:   # The initial memory is read from PreMemory.pickle, if it exists
+                    if pre_memory_read:
+                        print('Warning: Memory ' + memory_name + ' in PreMemories.pickle is ignored, as read from PreMemory.pickle')
+                    else:
+                        self.load_memory(memory)
+                else:
+                    self.memory_dictionary[memory_name] = memory
+        if _shared_memory_publication_mode:
+            self.publish_shared_memory()
+
+    def memory_name_list(self):
+        return [self.current_memory_name] + list(self.memory_dictionary)
+
+    def load_memory(self, memory):          # Make a memory the current one (without copying it)
+        self.root_dictionary = memory.root_dictionary
+        self.continuation_dictionary = memory.continuation_dictionary
+        self.continuation_dictionary_current_index = memory.continuation_dictionary_current_index
+        self.reachability_index = memory.reachability_index
+
+    def switch_memory(self, memory_name):   # Switch (in constant time) to another resident memory, created empty if it does not exist yet
+        if memory_name == self.current_memory_name:
+            return
+        with self.memory_lock:
+            current_memory = Memory(self.root_dictionary, self.continuation_dictionary, self.continuation_dictionary_current_index)
+            current_memory.reachability_index = self.reachability_index
+            self.memory_dictionary[self.current_memory_name] = current_memory   # The current memory becomes resident (not copied)
+            if memory_name in self.memory_dictionary:
+                print('Switch to memory ' + memory_name)
+                self.load_memory(self.memory_dictionary.pop(memory_name))
+            else:
+                print('Switch to new (empty) memory ' + memory_name)
+                self.load_memory(Memory({}, {}, 1))
+            self.current_memory_name = memory_name
+        if _shared_memory_publication_mode:     # Workers will generate with this memory (style),
+            self.request_shared_memory_publication()    # published in background, as switching may happen while playing
+
+    def request_shared_memory_publication(self):    # Publication done by a background thread, thus not delaying playing and listening
+                                                    # Requests made while a publication is in progress are coalesced into a next one
+        if self.publication_thread is None:
+            self.publication_stop = False
+            self.publication_thread = threading.Thread(target=self.publication_loop, daemon=True)
+            self.publication_thread.start()
+        self.publication_request.set()
+
+    def publication_loop(self):
+        while True:
+            self.publication_request.wait()
+            self.publication_request.clear()
+            if self.publication_stop:
+                break
+            self.publish_shared_memory()
+
+    def publish_shared_memory(self):        # Publication of a frozen (read-only) version of the memory, as flat arrays in a new shared memory block,
+                                            # then swapped in (atomically) by publishing its version number
+        with self.shared_memory_lock:
+            self.internal_publish_shared_memory()
+
+    def internal_publish_shared_memory(self):
+        publication_start_time = time.time()
+        with self.memory_lock:              # Capture of the current memory, which may be trained (but not replaced) meanwhile
+            root_dictionary = self.root_dictionary
+            continuation_dictionary = self.continuation_dictionary
+            memory_name = self.current_memory_name
+        root_list = list(root_dictionary.values())
+        node_list = list(root_list)         # Nodes, in breadth first order, thus children of a node are contiguous
+        first_child_list = []
+        child_number_list = []
+        continuation_index_list = []
+        continuation_start_list = []
+        continuation_number_list = []
+        for node in node_list:              # node_list is extended while iterating
+            children_list = node.children_list  # Lists are copied (atomically) once, as training may extend them meanwhile
+            children_list = [] if children_list is None else children_list[:]
+            first_child_list.append(len(node_list))
+            child_number_list.append(len(children_list))
+            node_list.extend(children_list)
+            node_continuation_index_list = node.continuation_index_list[:]
+            continuation_start_list.append(len(continuation_index_list))
+            continuation_number_list.append(len(node_continuation_index_list))
+            continuation_index_list.extend(node_continuation_index_list)
+        note_item_list = list(continuation_dictionary.items())  # Captured after the nodes, thus includes all continuations they refer to
+        note_number = max((index for index, note in note_item_list), default=0) + 1
+        version = self.shared_memory_version + 1
+        new_shared_memory = shared_memory.SharedMemory(name=_shared_memory_name + '_' + str(version), create=True,
+                                                       size=shared_memory_size(len(node_list), len(continuation_index_list), note_number))
+        np.ndarray((3,), dtype=np.int64, buffer=new_shared_memory.buf)[:] = [len(node_list), len(continuation_index_list), note_number]
+        array_dictionary = shared_memory_array_dictionary(new_shared_memory.buf)
+        array_dictionary['root_node'][:] = -1
+        for i, root in enumerate(root_list):
+            array_dictionary['root_node'][root.note.pitch] = i
+        array_dictionary['node_pitch'][:] = [node.note.pitch for node in node_list]
+        array_dictionary['node_first_child'][:] = first_child_list
+        array_dictionary['node_child_number'][:] = child_number_list
+        array_dictionary['node_continuation_start'][:] = continuation_start_list
+        array_dictionary['node_continuation_number'][:] = continuation_number_list
+        array_dictionary['continuation_index'][:] = continuation_index_list
+        array_dictionary['note_pitch'][:] = 0
+        array_dictionary['note_velocity'][:] = 0
+        array_dictionary['note_duration'][:] = np.nan
+        array_dictionary['note_delta'][:] = np.nan
+        note_index_list = [index for index, note in note_item_list]
+        note_list = [note for index, note in note_item_list]
+        array_dictionary['note_pitch'][note_index_list] = [note.pitch for note in note_list]
+        array_dictionary['note_velocity'][note_index_list] = [note.velocity for note in note_list]
+        array_dictionary['note_duration'][note_index_list] = [np.nan if note.duration is None else note.duration for note in note_list]
+        array_dictionary['note_delta'][note_index_list] = [np.nan if note.delta is None else note.delta for note in note_list]
+        del array_dictionary                # Release the views, for the block to be closable later
+        if self.shared_memory_control is None:
+            self.shared_memory_control = shared_memory.SharedMemory(name=_shared_memory_name, create=True, size=8)
+        np.ndarray((1,), dtype=np.int64, buffer=self.shared_memory_control.buf)[0] = version   # Atomic swap: workers will attach to the new version
+        self.shared_memory_version = version
+        self.shared_memory_list.append(new_shared_memory)
+        if len(self.shared_memory_list) > 2:    # The previous version is kept for workers still attaching to it, the older ones are unlinked
+            old_shared_memory = self.shared_memory_list.pop(0)
+            old_shared_memory.close()
+            old_shared_memory.unlink()      # Workers still attached to it keep it until they detach
+        print('Memory ' + memory_name + ' published in shared memory ' + _shared_memory_name + ' (version ' + str(version) + ', ' + str(len(node_list))
+              + ' nodes) in ' + str(round(time.time() - publication_start_time, 4)) + ' s')
+
+    def generation_request(self, note_sequence):    # Request for a generation worker, with the current maximum order and continuation length
+        return (note_sequence[-self.max_played_notes_considered:], self.max_order if _adaptive_tuning_mode else None, self.max_continuation_length)
+
+    def close_shared_memory(self):
+        if self.publication_thread is not None:     # Stop the publication thread, after its publication in progress, if any
+            self.publication_stop = True
+            self.publication_request.set()
+            self.publication_thread.join()
+            self.publication_thread = None
+        for published_shared_memory in self.shared_memory_list:
+            published_shared_memory.close()
+            published_shared_memory.unlink()
+        self.shared_memory_list = []
+        if self.shared_memory_control is not None:
+            self.shared_memory_control.close()
+            self.shared_memory_control.unlink()
+            self.shared_memory_control = None
+
+    def generate(self, input_note_sequence, constraint=None):             # Generation of a continuation sequence of MIDI messages from an input (played) sequence
+        self.matched_order_list = []
+        if constraint is not None:
+            self.build_reachability_index()  # If not yet built, not to be counted within the generation duration (for the adaptive tuning mode)
+        generation_start_time = time.time()
+        if constraint is None:
+            note_sequence = self.generate_note_sequence(input_note_sequence)
+        else:
+            note_sequence = self.generate_constrained_note_sequence(input_note_sequence, constraint)
+        if _adaptive_tuning_mode:
+            self.adapt(time.time() - generation_start_time, constraint is None)   # The length of a constrained continuation is not adjustable
         event_sequence = []
         event_time = time.time()
         for note in note_sequence:
@@ -210,79 +682,85 @@ class PrefixTreeContinuator:                # The main class and corresponding a
         event_sequence.sort(key = note_event_time)
         return event_sequence
 
+    def adapt(self, generation_duration, adjustable_length):  # Adaptive tuning of the maximum order, continuation length and number of played notes considered,
+                                            # from the last generation duration and orders of matching, to meet the target response latency
+                                            # (as the memory grows, generation slows down, thus the values are adjusted after each generation)
+        if not self.matched_order_list:
+            return
+        note_generation_duration = generation_duration / len(self.matched_order_list)
+        mean_matched_order = sum(self.matched_order_list) / len(self.matched_order_list)
+        if generation_duration > _target_response_latency:          # Too slow
+            if (mean_matched_order >= self.max_order / 2 or not adjustable_length) and self.max_order > _min_adaptive_order:
+                                                                    # The matching goes deep, thus its cost (proportional to the order) is reduced first
+                self.max_order = max(_min_adaptive_order, int(self.max_order * _target_response_latency / generation_duration))
+            elif adjustable_length:                                 # otherwise, fewer notes are generated
+                self.max_continuation_length = max(_min_adaptive_continuation_length, int(_target_response_latency / note_generation_duration))
+        elif generation_duration < _target_response_latency / 2:    # Fast enough to come back progressively to the maximum values
+            self.max_order = min(_max_order, self.max_order + 1)
+            self.max_continuation_length = min(_max_continuation_length, int(self.max_continuation_length * 1.25) + 1)
+        self.max_played_notes_considered = min(_max_played_notes_considered, self.max_order + 1)   # No need to consider more notes than the maximum order
+        print('Adaptive tuning: generation duration: ' + str(round(generation_duration, 4)) + ' s for ' + str(len(self.matched_order_list))
+              + ' notes (mean order matched: ' + str(round(mean_matched_order, 1)) + '), max order: ' + str(self.max_order)
+              + ', max continuation length: ' + str(self.max_continuation_length) + ', max played notes considered: ' + str(self.max_played_notes_considered))
+
+    def root(self, pitch):                  # Memory accessor interface (see generate_continuation_note_sequence), on the prefix trees
+        return self.root_dictionary.get(pitch)
+
+    def children(self, node):
+        return () if node.children_list is None else node.children_list
+
+    def node_pitch(self, node):
+        return node.note.pitch
+
+    def continuations(self, node):
+        return node.continuation_index_list
+
+    def note(self, continuation_index):
+        return self.continuation_dictionary[continuation_index]
+
+    def continuation_number(self):
+        return len(self.continuation_dictionary)
+
     def generate_note_sequence(self, note_sequence):
+        self.continuation_sequence = generate_continuation_note_sequence(self, note_sequence, self.max_order if _adaptive_tuning_mode else None,
+                                                                         self.max_continuation_length, self.matched_order_list)
+        return self.continuation_sequence
+
+    def build_reachability_index(self):     # The index is built once from the memory (then updated while training)
+        if self.reachability_index is None:
+            self.reachability_index = ReachabilityIndex(self.root_dictionary, self.continuation_dictionary)
+
+    def generate_constrained_note_sequence(self, note_sequence, constraint):
+                                                                    # Generation of a continuation of exactly constraint.length notes, satisfying the constraint,
+                                                                    # in one pass (without generate and reject), thanks to the reachability index:
+                                                                    # each next note is sampled only among the continuations from which a valid end can still be reached
+        self.build_reachability_index()
+        reachable_pitch_set_list = self.reachability_index.reachable_pitch_set_list(constraint)
         length_note_sequence = len(note_sequence)                   # Remember length of the played input sequence of notes, because note_sequence will be expanded (append)
-        last_input_note = note_sequence[-1]                         # We start with the last note of the reverse sequence: Note_N
-        self.continuation_sequence = []                             # Initialization: Assign continuation list to empty list
-        matching_child = None                                       # Declaring that flag
-        for i in range(1, _max_continuation_length):
-            ii = i
-            if last_input_note.pitch not in self.root_dictionary:   # If there is no matching tree root thus we cannot generate a continuation
-                if _general_default_random_generation_mode:         # If default random generation mode
-                    next_note = self.continuation_dictionary[random.randint(1, len(self.continuation_dictionary))]
-                    note_sequence.append(next_note)                 # Add this continuation note to the list of input notes
-                    self.continuation_sequence.append(next_note)    # Add this continuation note to the list of continuations
-                    last_input_note = next_note                     # And continue the generation from this (new) last note
-                elif i == 1 and _first_continuation_default_random_generation_mode:
-                    next_note = self.continuation_dictionary[random.randint(1, len(self.continuation_dictionary))]
-                    match _generation_duration_mode:
-                        # case 'Learnt':                            If Learnt duration, do nothing specific
-                        case 'Played':
-                            if ii > len(note_sequence):
-                                ii = i - len(note_sequence)
-                            next_note.duration = note_sequence[ii - 1].duration
-                        case 'Fixed':
-                            next_note.duration = _default_fixed_duration
-                    note_sequence.append(next_note)                 # Add this continuation note to the list of input notes
-                    self.continuation_sequence.append(next_note)    # Add this continuation note to the list of continuations
-                    last_input_note = next_note                     # And continue the generation from this (new) last note
-                else:                                               # Otherwise, no continuation possible,
-                    break                                           # and we exit from loop
-            else:                                                   # Otherwise,
-                current_node = self.root_dictionary[last_input_note.pitch]
-                j = 2                                               # Set up j index for a loop for traversing the tree
-                                                                    # j is the index of the jth last note of the input sequence
-                                                                    # and also the level within the tree
-                                                                    # Thus initially, j = 2 : starting with children from the root node to match penultimate note
-                while current_node.children_list is not None and j < length_note_sequence:
-                                                                    # Iteration to traverse the tree, with at each level (j),
-                                                                    # looking for a node matching corresponding note (last jth) of the input sequence
-                                                                    # The stop condition is:
-                                                                    # a) current node is a leaf (with no children)
-                                                                    # or b) j >= length of sequence of notes (i.e. we already parsed all notes of the input sequence)
-                    matching_child = None                           # Assign a flag to know if we have found a matching node within children
-                    for child in current_node.children_list:        # Iterate over children nodes to look for a node matching jth last note from input sequence
-                        if child.note.match(note_sequence[-j]):       # If one matches it
-                            matching_child = child                  # then, remember which it is
-                            break                                   # and exit from this children iteration loop
-                    if matching_child is None:                      # If none of the children matches it,
-                        break                                       # then, exit from the traversal to stop the search
-                    else:                                           # otherwise, we continue traversing the tree
-                        current_node = matching_child               # from current child node
-                        j += 1                                      # and down one more level (and previous element of the input sequence)
-                if current_node.children_list is None or j >= length_note_sequence or j > _max_order or matching_child is None:
-                                                                    # If the search is finished
-                                                                    # because:
-                                                                    # a) we reached a leaf,
-                                                                    # or b) we reached the end of the reverse sequence,
-                                                                    # or c) current matching has failed,
-                                                                    # then, we create a new continuation note
-                    current_node_continuation_index_list = current_node.continuation_index_list
-                    next_note = self.continuation_dictionary[current_node_continuation_index_list[random.randint(0, len(current_node_continuation_index_list) -1)]]
-                                                                    # by sorting within current node list of continuations
-                                                                    # as there may have several occurrences of the same note,
-                                                                    # this implements the probabilities of a Markov model
-                    match _generation_duration_mode:
-                        # case 'Learnt':                            If Learnt duration, do nothing specific
-                        case 'Played':
-                            if ii > len(note_sequence):
-                                ii = i - len(note_sequence)
-                            next_note.duration = note_sequence[ii - 1].duration
-                        case 'Fixed':
-                            next_note.duration = _default_fixed_duration
-                    note_sequence.append(next_note)                 # Add this continuation note to the list of input notes
-                    self.continuation_sequence.append(next_note)    # Add this continuation note to the list of continuations
-                    last_input_note = next_note                     # And continue the generation from this (new) last note
+        self.continuation_sequence = []
+        for i in range(1, constraint.length + 1):
+            reachable_pitch_set = reachable_pitch_set_list[constraint.length - i]   # Pitches from which a valid end can be reached with the remaining notes
+            candidate_index_list = []
+            node_list = matching_node_list(self, note_sequence, length_note_sequence, self.max_order if _adaptive_tuning_mode else None)
+            if node_list:
+                self.matched_order_list.append(len(node_list))
+                for node in reversed(node_list):                    # Starting with the longest match, keep the continuations reaching a valid end,
+                    for continuation_index in node.continuation_index_list:     # and back off to shorter matches if there is none
+                        if self.continuation_dictionary[continuation_index].pitch in reachable_pitch_set:
+                            candidate_index_list.append(continuation_index)
+                    if candidate_index_list:
+                        break
+            if not candidate_index_list and i == 1 and _first_continuation_default_random_generation_mode:
+                for continuation_index, continuation_note in self.continuation_dictionary.items():    # Random generation among the continuations reaching a valid end
+                    if continuation_note.pitch in reachable_pitch_set:
+                        candidate_index_list.append(continuation_index)
+            if not candidate_index_list:                            # Only possible for the first note, as after it a valid end is always reachable from the root
+                self.continuation_sequence = []                     # No continuation can satisfy the constraint
+                break
+            next_note = self.continuation_dictionary[candidate_index_list[random.randint(0, len(candidate_index_list) - 1)]]
+            set_generated_note_duration(next_note, note_sequence, i)
+            note_sequence.append(next_note)                         # Add this continuation note to the list of input notes
+            self.continuation_sequence.append(next_note)            # Add this continuation note to the list of continuations
         return self.continuation_sequence
 
     def play_midi_note_event(self, out_port, event, previous_event):
@@ -328,6 +806,14 @@ class PrefixTreeContinuator:                # The main class and corresponding a
                         last_note_end_time = current_time
                     elif (event.type == 'note_off') or (event.type == 'note_on' and event.velocity == 0):  # An event note_off without previous note_on
                         print('Warning: Event: ' + str(event) + 'with type: ' + str(event.type) + ' and Note: ' + str(event.note) + ' has been finished before being started')
+                    elif event.type == 'program_change' and event.program in _program_change_memory_name_dictionary:
+                        if played_notes:                            # Notes played in the previous style are not to be learnt in the new one
+                            if not current_note_on_dict:            # thus, if all have been ended, they are learnt in the current (previous) memory,
+                                self.train(played_notes)
+                            else:                                   # otherwise, they are forgotten
+                                print('Warning: Notes played before the program change and still on are not learnt')
+                            played_notes = []
+                        self.switch_memory(_program_change_memory_name_dictionary[event.program])   # Switch to the memory (style) of this program
                     # else: Other kind of event (e.g., clock), do nothing
                 # Player has stopped playing (at this time)
                 player_stop_duration = time.time() - last_note_end_time  # When there is no more played notes pending events
@@ -339,7 +825,9 @@ class PrefixTreeContinuator:                # The main class and corresponding a
                         continuator_stop_time = time.time()  # mark starting time for monitoring end of activity
                 elif played_notes and not current_note_on_dict and player_stop_duration > _player_stop_continuator_start_threshold:  # otherwise, if notes have been played, all notes on have been ended, and player has stopped playing
                     self.train(played_notes)                   # then, train from played notes (if any)
-                    self.continuation_sequence = self.generate(played_notes[-_max_played_notes_considered:])
+                    self.continuation_sequence = self.generate(played_notes[-self.max_played_notes_considered:], _generation_constraint)
+                    if _shared_memory_publication_mode:         # Published in background, while the continuation is played
+                        self.request_shared_memory_publication()
                     if not self.continuation_sequence:
                         print("Generation failed.")
                     played_notes = []
@@ -405,12 +893,112 @@ class PrefixTreeContinuator:                # The main class and corresponding a
             case 'File':
                 note_sequence = self.read_midi_file('PrePlayed.mid')
                 self.train(note_sequence)
-                self.continuation_sequence = self.generate(note_sequence[-_max_played_notes_considered:])
+                self.continuation_sequence = self.generate(note_sequence[-self.max_played_notes_considered:], _generation_constraint)
                 self.write_midi_file('Continuation.mid', self.continuation_sequence)
+            case 'Workers':  # Generation of several continuations, in parallel, by worker processes attached to the memory published in shared memory
+                note_sequence = self.read_midi_file('PrePlayed.mid')
+                self.train(note_sequence)
+                self.publish_shared_memory()
+                input_queue = multiprocessing.Queue()
+                output_queue = multiprocessing.Queue()
+                worker_list = []
+                for i in range(_generation_worker_number):
+                    worker = multiprocessing.Process(target=generation_worker, args=(input_queue, output_queue))
+                    worker.start()
+                    worker_list.append(worker)
+                    input_queue.put(self.generation_request(list(note_sequence)))
+                for i in range(_generation_worker_number):
+                    self.write_midi_file('Continuation' + str(i + 1) + '.mid', output_queue.get())
+                for worker in worker_list:
+                    input_queue.put(None)   # Stop the worker
+                for worker in worker_list:
+                    worker.join()
+            case 'Build':    # (Re)build the memory from a corpus of MIDI files
+                self.build_memory([self.read_midi_file(midi_file_name) for midi_file_name in _corpus_midi_file_name_list])
             case 'Batch':    # Batch test
                 self.batch_test([[48, 50, 52, 53], [48, 50, 50, 52], [48, 50], [50, 48], [48]])
         self.save_memory()
+        self.close_shared_memory()
+
+class SharedMemoryContinuator:              # Generation worker, attached (without copy) to the frozen memory published in shared memory by a PrefixTreeContinuator
+                                            # Only unconstrained generation is done by workers, constrained generation (NoteConstraint) remains within the PrefixTreeContinuator
+    def __init__(self, shared_memory_name=_shared_memory_name):
+        self.shared_memory_name = shared_memory_name
+        self.shared_memory_control = attach_shared_memory(shared_memory_name)
+        self.version_array = np.ndarray((1,), dtype=np.int64, buffer=self.shared_memory_control.buf)
+        self.version = 0
+        self.shared_memory = None
+        self.array_dictionary = None
+        self.refresh()
+
+    def refresh(self):                      # Attach to the last published version of the memory, if it has changed
+        version = int(self.version_array[0])
+        while version != self.version:
+            try:
+                new_shared_memory = attach_shared_memory(self.shared_memory_name + '_' + str(version))
+            except FileNotFoundError:       # Already replaced (and unlinked) by a newer version
+                version = int(self.version_array[0])
+                continue
+            self.detach()
+            self.shared_memory = new_shared_memory
+            self.array_dictionary = shared_memory_array_dictionary(new_shared_memory.buf)
+            self.version = version
+
+    def detach(self):
+        self.array_dictionary = None        # Release the views before closing the block
+        if self.shared_memory is not None:
+            self.shared_memory.close()
+            self.shared_memory = None
+
+    def close(self):
+        self.detach()
+        self.version_array = None
+        self.shared_memory_control.close()
+
+    def root(self, pitch):                  # Memory accessor interface (see generate_continuation_note_sequence), on the flat arrays, nodes being indexes
+        if not _min_midi_pitch <= pitch <= _max_midi_pitch:
+            return None
+        root_node = int(self.array_dictionary['root_node'][pitch])
+        return None if root_node < 0 else root_node
+
+    def children(self, node):               # Children of a node are contiguous
+        first_child = int(self.array_dictionary['node_first_child'][node])
+        return range(first_child, first_child + int(self.array_dictionary['node_child_number'][node]))
+
+    def node_pitch(self, node):
+        return int(self.array_dictionary['node_pitch'][node])
+
+    def continuations(self, node):
+        continuation_start = int(self.array_dictionary['node_continuation_start'][node])
+        return self.array_dictionary['continuation_index'][continuation_start:continuation_start + int(self.array_dictionary['node_continuation_number'][node])]
+
+    def note(self, continuation_index):     # Note (new object) corresponding to a continuation index
+        continuation_index = int(continuation_index)
+        duration = float(self.array_dictionary['note_duration'][continuation_index])
+        delta = float(self.array_dictionary['note_delta'][continuation_index])
+        return Note(pitch=int(self.array_dictionary['note_pitch'][continuation_index]), duration=None if np.isnan(duration) else duration,
+                    velocity=int(self.array_dictionary['note_velocity'][continuation_index]), start_time=0, delta=None if np.isnan(delta) else delta)
+
+    def continuation_number(self):          # Index 0 is not used
+        return len(self.array_dictionary['note_pitch']) - 1
+
+    def generate_note_sequence(self, note_sequence, max_order, max_continuation_length):
+                                            # With the maximum order (None if unbounded) and continuation length of the PrefixTreeContinuator
+                                            # (see PrefixTreeContinuator.generation_request)
+        self.refresh()
+        return generate_continuation_note_sequence(self, note_sequence, max_order, max_continuation_length)
+
+def generation_worker(input_queue, output_queue, shared_memory_name=_shared_memory_name):
+                                            # Main loop of a generation worker process, e.g., multiprocessing.Process(target=generation_worker, args=(input_queue, output_queue))
+                                            # Each request (see PrefixTreeContinuator.generation_request) is answered with a continuation (sequence of notes)
+                                            # generated from the last published memory, None stops the worker
+    random.seed()                           # Otherwise forked workers would all generate the same continuations
+    continuator_worker = SharedMemoryContinuator(shared_memory_name)
+    for note_sequence, max_order, max_continuation_length in iter(input_queue.get, None):
+        output_queue.put(continuator_worker.generate_note_sequence(note_sequence, max_order, max_continuation_length))
+    continuator_worker.close()
 
 # To run it:
-continuator = PrefixTreeContinuator()
-continuator.run('RealTime')
+if __name__ == '__main__':                  # Not when imported, e.g., by generation worker processes
+    continuator = PrefixTreeContinuator()
+    continuator.run('RealTime')